@@ -2,29 +2,72 @@
 
 from __future__ import annotations
 
+import atexit
+import codecs
+import contextlib
 import csv
 import json
 import os
 import re
+import sqlite3
 import sys
-import xml.etree.ElementTree as ET
+import tempfile
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 from enum import Enum
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 import requests
 import typer
-from rich import box
+from requests.adapters import HTTPAdapter
 from rich.console import Console
-from rich.progress import track
-from rich.table import Table
+from rich.text import Text
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    from requests_cache import CachedSession
+except ImportError:  # pragma: no cover - optional dependency
+    CachedSession = None
 
 __version__ = "0.2.3"
 __vdate = "2025-11-19"
 
 BASE_URL = "https://cdxapps.epa.gov/oms-substance-registry-services/rest-api/substance/cas"
+# Maximum number of EPA SRS requests in flight at once.
+MAX_WORKERS = 16
+# On-disk response cache used by --cache; SRS records change rarely.
+CACHE_PATH = Path.home() / ".cache" / "casquery.sqlite"
+CACHE_EXPIRE_AFTER = timedelta(days=30)
+# Non-seekable batch input is buffered in memory up to this size, then on disk.
+_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+_CAS_FORMATTED = re.compile(r"\d{2,7}-\d{2}-\d")
+_NON_DIGIT = re.compile(r"\D")
+# Deletes every Latin-1 character except 0-9; used ahead of _NON_DIGIT for the common ASCII case.
+_KEEP_DIGITS = str.maketrans("", "", "".join(chr(c) for c in range(256) if not chr(c).isdecimal()))
+_NON_ALNUM_DASH = re.compile(r"[^a-zA-Z0-9-]")
+# Empty result rows; copied per CAS RN, which is cheaper than rebuilding them with dict.fromkeys.
+_ROW_TEMPLATE: dict[str, Any] = dict.fromkeys(("cas_rn", "systematicName", "epaName", "currentCasNumber"))
+_SYNONYMS_ROW_TEMPLATE: dict[str, Any] = {**_ROW_TEMPLATE, "synonyms": None}
+# Entity table for XML element text. Quotes only need escaping inside attributes, which we never write.
+_XML_ESC = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
 
 console = Console()
+err_console = Console(stderr=True)
+_SESSION: requests.Session | None = None
+# Worker threads in casrn_search can all make their first request at once.
+_SESSION_LOCK = threading.Lock()
+_USE_CACHE = False
+_REFRESH_CACHE = False
 app = typer.Typer(add_completion=False, help="CAS RN utility for EPA SRS.")
 
 
@@ -38,7 +81,7 @@ class OutputFormat(str, Enum):
     CSV = "csv"
 
 
-def normalize_cas(cas: str) -> str | None:
+def normalize_cas(cas: str, validate_checksum: bool = False) -> str | None:
     """Normalize a CAS RN to the form 'XXXXXX-YY-Z'.
 
     Rules:
@@ -46,10 +89,40 @@ def normalize_cas(cas: str) -> str | None:
     - Require between 3 and 10 digits (CAS max).
     - Group as: [all but last 3]-[second to last 2]-[last digit].
     - First group must be at least 2 digits (per CAS convention).
+    - If validate_checksum is True, the check digit must also be correct.
 
     Returns None if it can't be normalized.
     """
-    digits = re.sub(r"\D", "", cas or "")
+    norm = _normalize_cached(cas or "")
+    if norm and validate_checksum and not valid_check_digit(norm):
+        return None
+    return norm
+
+
+def valid_check_digit(cas: str) -> bool:
+    """Return True if a normalized CAS RN's check digit matches its other digits.
+
+    The check digit is the sum of the remaining digits, each multiplied by its
+    position counting from the right (starting at 1), modulo 10.
+    """
+    digits = cas.replace("-", "")
+    total = sum(i * int(d) for i, d in enumerate(reversed(digits[:-1]), start=1))
+    return total % 10 == int(digits[-1])
+
+
+@lru_cache(maxsize=100_000)
+def _normalize_cached(cas: str) -> str | None:
+    """Memoized body of normalize_cas; batch CSVs repeat the same CAS RN many times."""
+    stripped = cas.strip()
+    if _CAS_FORMATTED.fullmatch(stripped):
+        # Already in canonical form; rebuilding it from its digits would give the same string.
+        return stripped
+
+    # isdecimal() matches exactly what \d matches, so digit-only input needs no cleanup at all.
+    digits = cas if cas.isdecimal() else cas.translate(_KEEP_DIGITS)
+    if not digits.isascii():
+        # Characters beyond Latin-1 survive the translate table; let the regex decide which are digits.
+        digits = _NON_DIGIT.sub("", digits)
     if len(digits) < 3 or len(digits) > 10:
         return None
 
@@ -63,64 +136,171 @@ def normalize_cas(cas: str) -> str | None:
     return f"{first}-{second}-{check}"
 
 
+def _get_session() -> requests.Session:
+    """Return the shared HTTP session, creating it on first use.
+
+    Reusing one session keeps the connection to EPA SRS alive between
+    queries instead of paying a new TCP + TLS handshake per CAS RN.
+    """
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                if _USE_CACHE:
+                    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+                    session = CachedSession(str(CACHE_PATH), backend="sqlite", expire_after=CACHE_EXPIRE_AFTER)
+                else:
+                    session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=32))
+                _SESSION = session
+    return _SESSION
+
+
+def _close_session() -> None:
+    """Close the shared HTTP session, if one was created."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+            _SESSION = None
+
+
+atexit.register(_close_session)
+
+
+def enable_cache(enabled: bool = True, refresh: bool = False) -> None:
+    """Turn the on-disk EPA SRS response cache on or off for subsequent requests.
+
+    With ``refresh``, every response is fetched from EPA SRS and replaces the
+    cached copy. Requires the optional ``requests-cache`` dependency; raises
+    RuntimeError if it is missing or the cache file can't be opened.
+    """
+    global _USE_CACHE, _REFRESH_CACHE
+    if enabled and CachedSession is None:
+        raise RuntimeError("Response caching requires requests-cache: pip install 'casquery[cache]'")
+    if enabled != _USE_CACHE:
+        _close_session()
+        _USE_CACHE = enabled
+    _REFRESH_CACHE = enabled and refresh
+    if enabled:
+        # Open the cache here rather than lazily in a casrn_search worker thread,
+        # where an unwritable directory or corrupt database would escape as a traceback.
+        try:
+            _get_session()
+        except (OSError, sqlite3.Error) as err:
+            _USE_CACHE = _REFRESH_CACHE = False
+            raise RuntimeError(f"Could not open the response cache at {CACHE_PATH}: {err}") from err
+
+
+def _warn(message: str) -> None:
+    """Report a non-fatal problem on stderr so piped JSON/CSV/XML output stays clean.
+
+    Rich rendering is skipped entirely when stderr isn't a terminal.
+    """
+    if sys.stderr.isatty():
+        err_console.print(message)
+    else:
+        sys.stderr.write(Text.from_markup(message).plain + "\n")
+
+
 def send_request(url: str) -> list[dict] | None:
     """Send an HTTP GET request and return parsed JSON or None on failure."""
     try:
-        response = requests.get(url, timeout=5)
+        # force_refresh is a requests-cache option; plain sessions never see it.
+        kwargs = {"force_refresh": True} if _REFRESH_CACHE else {}
+        response = _get_session().get(url, timeout=5, **kwargs)
         if not response.ok:
-            console.print(f"[yellow]Warning:[/yellow] Received status {response.status_code} for {url}")
+            _warn(f"[yellow]Warning:[/yellow] Received status {response.status_code} for {url}")
             return None
+        if orjson is not None:
+            try:
+                return orjson.loads(response.content)
+            except orjson.JSONDecodeError:
+                # e.g. a non-UTF-8 body; let requests sniff the encoding and report errors as before.
+                pass
         return response.json()
     except requests.RequestException as err:
-        console.print(f"[bold red]Request error:[/bold red] {err}")
+        _warn(f"[bold red]Request error:[/bold red] {err}")
         return None
 
 
+def track(sequence: Iterable[Any], **kwargs: Any) -> Iterable[Any]:
+    """Lazily imported rich.progress.track; rich.progress loads rich.table on import."""
+    from rich.progress import track as rich_track
+
+    return rich_track(sequence, **kwargs)
+
+
+def _clean_cas(cas_rn: str) -> str:
+    """Return the normalized CAS RN, or the raw value stripped of stray characters if it can't be normalized."""
+    cleaned_norm = normalize_cas(cas_rn)
+    return cleaned_norm if cleaned_norm else _NON_ALNUM_DASH.sub("", cas_rn)
+
+
+def _query_one(cleaned: str, synonyms: bool = False) -> dict[str, Any]:
+    """Query EPA SRS for a single cleaned CAS RN and build its result row."""
+    url = f"{BASE_URL}/{cleaned}?qualifier=exact"
+    result = send_request(url)
+
+    row: dict[str, Any] = (_SYNONYMS_ROW_TEMPLATE if synonyms else _ROW_TEMPLATE).copy()
+    row["cas_rn"] = cleaned
+
+    if result:
+        get = result[0].get
+        row["systematicName"] = get("systematicName")
+        row["epaName"] = get("epaName")
+        row["currentCasNumber"] = get("currentCasNumber")
+
+        if synonyms:
+            syns = get("synonyms") or ()
+            row["synonyms"] = ";".join(filter(None, (s.get("synonymName") for s in syns))) or None
+
+    return row
+
+
 def casrn_search(
     cas_rn_list: list[str],
     synonyms: bool = False,
     output_format: OutputFormat = OutputFormat.TABLE,
+    sort: bool = True,
 ) -> list[dict[str, Any]]:
-    """Query EPA SRS for a list of CAS RN and return results as a list of dicts."""
-
-    header = ["cas_rn", "systematicName", "epaName", "currentCasNumber"]
-    if synonyms:
-        header.append("synonyms")
-
-    rows: list[dict[str, Any]] = []
-
-    use_progress = output_format == OutputFormat.TABLE
+    """Query EPA SRS for a list of CAS RN and return results as a list of dicts.
 
-    iter_cas = track(cas_rn_list, description="Querying EPA SRS") if use_progress else cas_rn_list
+    Rows are sorted by (currentCasNumber, cas_rn) unless ``sort`` is False,
+    in which case they follow the input order.
+    """
 
-    for cas_rn in iter_cas:
-        cleaned_norm = normalize_cas(cas_rn)
-        cleaned = cleaned_norm if cleaned_norm else re.sub(r"[^a-zA-Z0-9-]", "", cas_rn)
+    # Inputs that clean to the same CAS RN share a single request.
+    cleaned_list = [_clean_cas(cas_rn) for cas_rn in cas_rn_list]
+    unique: dict[str, dict[str, Any]] = {}
 
-        url = f"{BASE_URL}/{cleaned}?qualifier=exact"
-        result = send_request(url)
+    # The progress bar is pure overhead when nobody is watching the terminal (CI, `| less`, redirects).
+    use_progress = output_format == OutputFormat.TABLE and console.is_terminal
 
-        row: dict[str, Any] = dict.fromkeys(header)
-        row["cas_rn"] = cleaned
+    # Not a `with` block: its exit waits for every queued request, so Ctrl-C or a failed
+    # query would keep hitting EPA SRS until the whole list had been sent.
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        futures = {executor.submit(_query_one, cleaned, synonyms): cleaned for cleaned in dict.fromkeys(cleaned_list)}
 
-        if result:
-            r0 = result[0]
-            row["systematicName"] = r0.get("systematicName")
-            row["epaName"] = r0.get("epaName")
-            row["currentCasNumber"] = r0.get("currentCasNumber")
+        # Advance the progress bar as each request finishes.
+        done = as_completed(futures)
+        iter_done = (
+            track(done, total=len(futures), description="Querying EPA SRS", console=console) if use_progress else done
+        )
 
-            if synonyms:
-                syns = r0.get("synonyms", [])
-                row["synonyms"] = ";".join(s.get("synonymName", "") for s in syns if s.get("synonymName")) or None
+        for future in iter_done:
+            unique[futures[future]] = future.result()
+    except BaseException:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
 
-        rows.append(row)
+    # Fan results back out so every input still gets its own row.
+    rows: list[dict[str, Any]] = [unique[cleaned].copy() for cleaned in cleaned_list]
 
-    rows.sort(
-        key=lambda r: (
-            r.get("currentCasNumber") or "",
-            r.get("cas_rn") or "",
-        ),
-    )
+    if sort:
+        rows.sort(key=lambda r: (r["currentCasNumber"] or "", r["cas_rn"] or ""))
 
     return rows
 
@@ -130,6 +310,10 @@ def casrn_search(
 
 def print_table(rows: list[dict[str, Any]]) -> None:
     """Render the results as a Rich table."""
+    # Only the table output needs these; rich.table also pulls in rich.box and friends.
+    from rich import box
+    from rich.table import Table
+
     if not rows:
         console.print("[yellow]No results returned.[/yellow]")
         return
@@ -146,46 +330,100 @@ def print_table(rows: list[dict[str, Any]]) -> None:
     for col in headers:
         table.add_column(col)
 
+    getter = _row_getter(headers)
     for row in rows:
-        table.add_row(*[("" if row[col] is None else str(row[col])) for col in headers])
+        table.add_row(*["" if value is None else str(value) for value in getter(row)])
 
     console.print()
     console.print(table)
     console.print()
 
 
+def _row_getter(headers: list[str]) -> Callable[[dict[str, Any]], tuple[Any, ...]]:
+    """Return a callable that pulls the ``headers`` values out of a row dict, in order.
+
+    Backed by operator.itemgetter so each CSV row is extracted in a single C call.
+    """
+    getter = itemgetter(*headers)
+    if len(headers) == 1:
+        # itemgetter with one key returns a bare value rather than a 1-tuple.
+        return lambda row: (getter(row),)
+    return getter
+
+
 def rows_to_csv_stdout(rows: list[dict[str, Any]]) -> None:
     """Write rows as CSV to stdout."""
     if not rows:
         return
     headers = list(rows[0].keys())
-    writer = csv.DictWriter(sys.stdout, fieldnames=headers)
-    writer.writeheader()
-    writer.writerows(rows)
+    getter = _row_getter(headers)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(headers)
+    writer.writerows(map(getter, rows))
     sys.stdout.flush()
 
 
-def rows_to_json_stdout(rows: list[dict[str, Any]]) -> None:
-    """Write rows as JSON to stdout."""
-    json.dump(rows, sys.stdout, indent=2)
-    sys.stdout.write("\n")
-    sys.stdout.flush()
+def _dump_json_row(row: dict[str, Any]) -> bytes:
+    """Encode a single row as indented UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(row, option=orjson.OPT_INDENT_2)
+    return json.dumps(row, indent=2, ensure_ascii=False).encode("utf-8")
 
 
-def rows_to_xml_stdout(rows: list[dict[str, Any]]) -> None:
-    """Write rows as a simple XML document to stdout."""
-    root = ET.Element("casResults")
+def _is_utf8(encoding: str | None) -> bool:
+    """Return True if ``encoding`` names UTF-8 (under any alias)."""
+    try:
+        return encoding is not None and codecs.lookup(encoding).name == "utf-8"
+    except LookupError:
+        return False
+
+
+def rows_to_json_stdout(rows: Iterable[dict[str, Any]]) -> None:
+    """Write rows as a JSON array to stdout, encoding one row at a time.
+
+    A UTF-8 stdout gets raw UTF-8, written straight to its byte buffer when it has one.
+    Any other stream (a cp1252 console, a StringIO) gets ASCII-only JSON, as json.dump writes by default.
+    """
+    stream = sys.stdout
+    utf8 = _is_utf8(getattr(stream, "encoding", None))
+    buffer = getattr(stream, "buffer", None) if utf8 else None
+    pieces = ("[\n  ", ",\n  ", "\n", "\n  ", "\n]\n", "[]\n")
+    out: Any
+    if buffer is not None:
+        stream.flush()
+        out, dump = buffer, _dump_json_row
+        pieces = tuple(piece.encode() for piece in pieces)
+    elif utf8:
+        out, dump = stream, lambda row: _dump_json_row(row).decode("utf-8")
+    else:
+        out, dump = stream, lambda row: json.dumps(row, indent=2)
+    open_, sep, nl, indent_nl, close, empty = pieces
+
+    started = False
+    for row in rows:
+        out.write(sep if started else open_)
+        started = True
+        # Nest each row's own indentation one level inside the array.
+        out.write(dump(row).replace(nl, indent_nl))
+    out.write(close if started else empty)
+    out.flush()
+
+
+def rows_to_xml_stdout(rows: Iterable[dict[str, Any]]) -> None:
+    """Write rows as a simple XML document to stdout, one <result> element at a time."""
+    out = sys.stdout
+    started = False
     for row in rows:
-        item = ET.SubElement(root, "result")
+        if not started:
+            out.write("<casResults>\n")
+            started = True
+        out.write("  <result>\n")
         for key, value in row.items():
-            child = ET.SubElement(item, key)
-            child.text = "" if value is None else str(value)
-
-    tree = ET.ElementTree(root)
-    ET.indent(tree, space="  ", level=0)
-    tree.write(sys.stdout, encoding="unicode", xml_declaration=False)
-    sys.stdout.write("\n")
-    sys.stdout.flush()
+            text = "" if value is None else str(value).translate(_XML_ESC)
+            out.write(f"    <{key}>{text}</{key}>\n" if text else f"    <{key} />\n")
+        out.write("  </result>\n")
+    out.write("</casResults>\n" if started else "<casResults />\n")
+    out.flush()
 
 
 def write_csv_file(rows: list[dict[str, Any]], out_path: str) -> None:
@@ -196,10 +434,12 @@ def write_csv_file(rows: list[dict[str, Any]], out_path: str) -> None:
 
     headers = list(rows[0].keys())
 
+    getter = _row_getter(headers)
+
     with open(out_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(rows)
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(map(getter, rows))
 
     console.print(f"\n[bold green]Results written to {out_path}[/bold green]")
 
@@ -233,6 +473,35 @@ def app_callback(
 # ---------- Commands ----------
 
 
+def _set_cache(cache: bool | None) -> None:
+    """Apply the --cache/--no-cache option, exiting with a message if caching is unavailable.
+
+    --cache reads and writes the cache, --no-cache refreshes it, and neither leaves it untouched.
+    """
+    try:
+        if cache is None:
+            enable_cache(False)
+        elif cache:
+            enable_cache(True)
+        else:
+            # Without requests-cache there is nothing stored to refresh.
+            enable_cache(CachedSession is not None, refresh=True)
+    except RuntimeError as err:
+        console.print(f"[red]{err}[/red]")
+        raise typer.Exit(1) from err
+
+
+# Shared by every command; the help text is built from the settings it describes.
+_CACHE_OPTION = typer.Option(
+    None,
+    "--cache/--no-cache",
+    help=(
+        f"--cache reuses EPA SRS responses cached on disk ({CACHE_PATH}) for up to {CACHE_EXPIRE_AFTER.days} days; "
+        "--no-cache fetches fresh responses and refreshes the cache."
+    ),
+)
+
+
 @app.command()
 def search(
     cas_rn: list[str] = typer.Argument(
@@ -258,13 +527,17 @@ def search(
         "-f",
         help="Write results to casquery.csv instead of printing to stdout.",
     ),
+    cache: bool | None = _CACHE_OPTION,
 ) -> None:
     """Search the EPA Substance Registry Service (SRS) by CAS RN."""
+    _set_cache(cache)
 
     rows = casrn_search(
         cas_rn_list=cas_rn,
         synonyms=synonyms,
         output_format=output_format,
+        # Only the table view is sorted; machine-readable formats keep input order.
+        sort=output_format == OutputFormat.TABLE,
     )
 
     if file:
@@ -318,8 +591,10 @@ def resolve(
         ...,
         help="CAS RN to resolve to the current CAS according to EPA SRS.",
     ),
+    cache: bool | None = _CACHE_OPTION,
 ) -> None:
     """Resolve a CAS RN to its currentCasNumber using EPA SRS."""
+    _set_cache(cache)
     norm = normalize_cas(cas_rn)
     if not norm:
         console.print("[red]Input CAS RN is not structurally valid.[/red]")
@@ -337,6 +612,13 @@ def resolve(
         console.print(f"[cyan]{norm}[/cyan] -> current CAS RN: [bold green]{current}[/bold green]")
 
 
+def _tee_lines(lines: Iterable[str], copy: IO[str]) -> Iterator[str]:
+    """Yield each line from ``lines`` after writing it to ``copy``."""
+    for line in lines:
+        copy.write(line)
+        yield line
+
+
 @app.command()
 def batch(
     input_csv: Path = typer.Argument(
@@ -358,69 +640,114 @@ def batch(
         "-o",
         help="Output CSV file path.",
     ),
+    check_digit: bool = typer.Option(
+        False,
+        "--check-digit",
+        help="Leave CAS RN with an invalid check digit unnormalized instead of querying EPA SRS for them.",
+    ),
+    cache: bool | None = _CACHE_OPTION,
 ) -> None:
     """Batch-process a CSV of CAS RN: normalize, resolve, and attach EPA SRS metadata."""
+    _set_cache(cache)
 
     console.print(f"[bold cyan]CASRN Batch Processing[/bold cyan] v{__version__} ({__vdate})\n")
 
-    with input_csv.open("r", newline="", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-
-    if not rows:
-        console.print("[yellow]Input CSV has no rows.[/yellow]")
-        raise typer.Exit(1)
-
-    if column not in rows[0]:
-        console.print(f"[red]Column '{column}' not found in CSV header.[/red]")
-        raise typer.Exit(1)
-
-    unique_norms: set[str] = set()
-    for row in rows:
-        raw = row.get(column, "") or ""
-        norm = normalize_cas(raw)
-        row["casquery_normalized"] = norm or ""
-
-        if norm:
-            unique_norms.add(norm)
-
-    result_map: dict[str, dict[str, Any]] = {}
-    if unique_norms:
-        cas_list = sorted(unique_norms)
-        resolution_rows = casrn_search(cas_list, synonyms=False, output_format=OutputFormat.TABLE)
-        for r in resolution_rows:
-            key = r.get("cas_rn")
-            if key:
-                result_map[key] = r
-
-    for row in rows:
-        norm = row.get("casquery_normalized") or ""
-        srs = result_map.get(norm) if norm else None
-
-        if srs:
-            row["casquery_resolved"] = srs.get("currentCasNumber") or ""
-            row["casquery_systematicName"] = srs.get("systematicName") or ""
-            row["casquery_epaName"] = srs.get("epaName") or ""
+    with contextlib.ExitStack() as stack:
+        # Pass 1: stream the input once to collect the distinct normalized CAS RN.
+        unique_norms: set[str] = set()
+        n_rows = 0
+        f = stack.enter_context(input_csv.open("r", newline="", encoding="utf-8-sig"))
+        if f.seekable():
+            source = f
+            lines: Iterable[str] = f
         else:
-            row["casquery_resolved"] = ""
-            row["casquery_systematicName"] = ""
-            row["casquery_epaName"] = ""
-
-    fieldnames = list(rows[0].keys())
-    for extra in [
-        "casquery_normalized",
-        "casquery_resolved",
-        "casquery_systematicName",
-        "casquery_epaName",
-    ]:
-        if extra not in fieldnames:
-            fieldnames.append(extra)
-
-    with output_csv.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-
+            # A pipe (`<(cmd)`, /dev/stdin) can only be read once; keep a copy for pass 2.
+            source = stack.enter_context(
+                tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE, mode="w+", newline="", encoding="utf-8")
+            )
+            lines = _tee_lines(f, source)
+        reader = csv.reader(lines)
+        header = next(reader, [])
+        # With duplicate header names the last one wins, as it would in csv.DictReader.
+        col_idx = len(header) - 1 - header[::-1].index(column) if column in header else None
+        for record in reader:
+            if not record:
+                continue
+            n_rows += 1
+            if col_idx is not None and col_idx < len(record):
+                norm = normalize_cas(record[col_idx], validate_checksum=check_digit)
+                if norm:
+                    unique_norms.add(norm)
+
+        if not n_rows:
+            console.print("[yellow]Input CSV has no rows.[/yellow]")
+            raise typer.Exit(1)
+
+        if col_idx is None:
+            console.print(f"[red]Column '{column}' not found in CSV header.[/red]")
+            raise typer.Exit(1)
+
+        result_map: dict[str, dict[str, Any]] = {}
+        if unique_norms:
+            cas_list = sorted(unique_norms)
+            resolution_rows = casrn_search(cas_list, synonyms=False, output_format=OutputFormat.TABLE, sort=False)
+            for r in resolution_rows:
+                key = r.get("cas_rn")
+                if key:
+                    result_map[key] = r
+
+        extras = [
+            "casquery_normalized",
+            "casquery_resolved",
+            "casquery_systematicName",
+            "casquery_epaName",
+        ]
+        # Extra columns already present in the input (e.g. a re-run) are overwritten in place.
+        fieldnames = header + [extra for extra in extras if extra not in header]
+        extra_idx = [fieldnames.index(extra) for extra in extras]
+        width = len(header)
+        n_overflow = 0
+
+        # Pass 2: rescan the same handle (or its spooled copy), attaching SRS metadata row by row.
+        source.seek(0)
+        with output_csv.open("w", newline="", encoding="utf-8") as fout:
+            reader = csv.reader(source)
+            next(reader, None)
+            writer = csv.writer(fout)
+            writer.writerow(fieldnames)
+
+            for record in reader:
+                if not record:
+                    continue
+                # Short rows are padded to the header; fields past the header are kept after the extras.
+                out = record[:width]
+                out.extend([""] * (len(fieldnames) - len(out)))
+                if len(record) > width:
+                    n_overflow += 1
+                    out.extend(record[width:])
+
+                norm = normalize_cas(record[col_idx], validate_checksum=check_digit) if col_idx < len(record) else None
+                srs = result_map.get(norm) if norm else None
+
+                if srs:
+                    values = (
+                        norm or "",
+                        srs.get("currentCasNumber") or "",
+                        srs.get("systematicName") or "",
+                        srs.get("epaName") or "",
+                    )
+                else:
+                    values = (norm or "", "", "", "")
+
+                for idx, value in zip(extra_idx, values, strict=True):
+                    out[idx] = value
+                writer.writerow(out)
+
+    if n_overflow:
+        console.print(
+            f"[yellow]{n_overflow} row(s) had more fields than the header; "
+            "the extra fields were kept after the casquery_* columns.[/yellow]"
+        )
     console.print(f"[bold green]Batch results written to {output_csv}[/bold green]")
 
 
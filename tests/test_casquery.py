@@ -1,9 +1,20 @@
+import contextlib
 import csv
+import io
 import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 import pytest
+import requests
+from rich.console import Console
 from typer.testing import CliRunner
 
 from casquery import casquery
@@ -23,11 +34,44 @@ def no_progress(monkeypatch):
     def _track(iterable, **kwargs):
         return iterable
 
-    # casquery.track is the imported symbol from rich.progress
+    # casquery.track is the module's lazy wrapper around rich.progress.track
     monkeypatch.setattr(casquery, "track", _track)
     yield
 
 
+class FakeResponse:
+    """Just enough of requests.Response for send_request."""
+
+    def __init__(self, content: bytes = b"[]", status_code: int = 200, encoding: str = "utf-8") -> None:
+        self.content = content
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.encoding = encoding
+
+    def json(self):
+        return json.loads(self.content.decode(self.encoding))
+
+
+class FakeSession:
+    """Records every GET and answers it with ``self.response``."""
+
+    def __init__(self) -> None:
+        self.response = FakeResponse()
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+
+    def get(self, url: str, **kwargs: Any) -> FakeResponse:
+        self.calls.append((url, kwargs))
+        return self.response
+
+
+@pytest.fixture
+def fake_session(monkeypatch) -> FakeSession:
+    """Route send_request through a FakeSession instead of the network."""
+    session = FakeSession()
+    monkeypatch.setattr(casquery, "_get_session", lambda: session)
+    return session
+
+
 # -----------------------
 # normalize_cas tests
 # -----------------------
@@ -41,6 +85,9 @@ def no_progress(monkeypatch):
         ("12 34 56 7", "1234-56-7"),
         ("  375-73-5  ", "375-73-5"),
         ("375735", "375-73-5"),
+        ("CAS# 375\u201373\u20135", "375-73-5"),
+        ("1234567-89-5", "1234567-89-5"),
+        ("\t7732-18-5\n", "7732-18-5"),
     ],
 )
 def test_normalize_cas_valid(raw: str, expected: str) -> None:
@@ -61,6 +108,169 @@ def test_normalize_cas_invalid(raw: str) -> None:
     assert casquery.normalize_cas(raw) is None
 
 
+@pytest.mark.parametrize(
+    ("cas", "expected"),
+    [
+        ("7732-18-5", True),  # water
+        ("375-73-5", True),
+        ("29420-49-3", True),
+        ("29420-43-3", False),
+        ("7732-18-4", False),
+    ],
+)
+def test_valid_check_digit(cas: str, expected: bool) -> None:
+    assert casquery.valid_check_digit(cas) is expected
+
+
+def test_normalize_cas_validate_checksum() -> None:
+    assert casquery.normalize_cas("7732185", validate_checksum=True) == "7732-18-5"
+    assert casquery.normalize_cas("7732184", validate_checksum=True) is None
+    # Without validation the structure alone is enough.
+    assert casquery.normalize_cas("7732184") == "7732-18-4"
+
+
+# -----------------------
+# send_request tests
+# -----------------------
+
+
+def test_get_session_is_reused(monkeypatch) -> None:
+    """_get_session should hand out the same session until it is closed."""
+    monkeypatch.setattr(casquery, "_SESSION", None)
+
+    first = casquery._get_session()
+    assert casquery._get_session() is first
+
+    casquery._close_session()
+    assert casquery._SESSION is None
+
+
+def test_get_session_concurrent_first_calls(monkeypatch) -> None:
+    """Threads racing on the first request should all get one shared session."""
+    created: list[object] = []
+
+    class SlowSession(requests.Session):
+        def __init__(self) -> None:
+            super().__init__()
+            created.append(self)
+            # Widen the window between the None check and the assignment.
+            time.sleep(0.02)
+
+    monkeypatch.setattr(casquery, "_SESSION", None)
+    monkeypatch.setattr(casquery.requests, "Session", SlowSession)
+
+    barrier = threading.Barrier(casquery.MAX_WORKERS)
+
+    def first_call() -> object:
+        barrier.wait()
+        return casquery._get_session()
+
+    with ThreadPoolExecutor(max_workers=casquery.MAX_WORKERS) as executor:
+        sessions = list(executor.map(lambda _: first_call(), range(casquery.MAX_WORKERS)))
+
+    try:
+        assert len(created) == 1
+        assert all(s is created[0] for s in sessions)
+    finally:
+        casquery._close_session()
+
+
+def test_send_request_uses_shared_session(fake_session: FakeSession) -> None:
+    """send_request should go through the shared session and parse JSON."""
+    fake_session.response = FakeResponse(b'[{"currentCasNumber": "375-73-5"}]')
+
+    assert casquery.send_request("https://example.test/a") == [{"currentCasNumber": "375-73-5"}]
+    assert casquery.send_request("https://example.test/b") == [{"currentCasNumber": "375-73-5"}]
+    assert [url for url, _ in fake_session.calls] == ["https://example.test/a", "https://example.test/b"]
+
+
+def test_enable_cache_uses_cached_session(monkeypatch, tmp_path: Path) -> None:
+    """With caching enabled the shared session should be an on-disk CachedSession."""
+    requests_cache = pytest.importorskip("requests_cache")
+    cache_path = tmp_path / "cache" / "casquery.sqlite"
+    monkeypatch.setattr(casquery, "CACHE_PATH", cache_path)
+    monkeypatch.setattr(casquery, "_SESSION", None)
+
+    casquery.enable_cache()
+    try:
+        assert isinstance(casquery._get_session(), requests_cache.CachedSession)
+        assert cache_path.parent.is_dir()
+    finally:
+        casquery.enable_cache(False)
+
+    assert casquery._SESSION is None
+    assert not isinstance(casquery._get_session(), requests_cache.CachedSession)
+
+
+def test_cli_cache_requires_requests_cache(monkeypatch) -> None:
+    """--cache should fail cleanly when requests-cache is not installed."""
+    monkeypatch.setattr(casquery, "CachedSession", None)
+
+    result = runner.invoke(casquery.app, ["search", "--cache", "375-73-5"])
+    assert result.exit_code == 1
+    assert "requests-cache" in result.stdout
+
+
+@pytest.mark.parametrize("make_bad_cache", ["unwritable_dir", "corrupt_db"])
+def test_cli_cache_open_failure_exits_cleanly(monkeypatch, tmp_path: Path, make_bad_cache: str) -> None:
+    """A cache that can't be opened should give the red message and exit 1, not a worker traceback."""
+    pytest.importorskip("requests_cache")
+    if make_bad_cache == "unwritable_dir":
+        # A regular file where the cache directory should be makes mkdir fail.
+        (tmp_path / "cache").write_text("", encoding="utf-8")
+    else:
+        (tmp_path / "cache").mkdir()
+        (tmp_path / "cache" / "casquery.sqlite").write_bytes(b"not a database" * 100)
+    monkeypatch.setattr(casquery, "CACHE_PATH", tmp_path / "cache" / "casquery.sqlite")
+    monkeypatch.setattr(casquery, "_SESSION", None)
+    monkeypatch.setattr(casquery, "send_request", lambda url: pytest.fail("no request should be sent"))
+
+    result = runner.invoke(casquery.app, ["search", "--cache", "375-73-5"])
+    assert result.exit_code == 1
+    assert "Could not open the response cache" in result.stdout
+    assert casquery._USE_CACHE is False
+    casquery._close_session()
+
+
+def test_cli_no_cache_refreshes_cached_responses(monkeypatch, fake_session: FakeSession) -> None:
+    """--no-cache should send force_refresh so stale cached responses get replaced."""
+    pytest.importorskip("requests_cache")
+    monkeypatch.setattr(casquery, "_USE_CACHE", False)
+    monkeypatch.setattr(casquery, "_REFRESH_CACHE", False)
+
+    try:
+        result = runner.invoke(casquery.app, ["search", "--no-cache", "375-73-5"])
+        assert result.exit_code == 0
+        assert casquery._USE_CACHE is True
+        assert [kwargs for _, kwargs in fake_session.calls] == [{"timeout": 5, "force_refresh": True}]
+
+        fake_session.calls.clear()
+        result = runner.invoke(casquery.app, ["search", "375-73-5"])
+        assert result.exit_code == 0
+        assert casquery._USE_CACHE is False
+        assert [kwargs for _, kwargs in fake_session.calls] == [{"timeout": 5}]
+    finally:
+        casquery.enable_cache(False)
+
+
+def test_send_request_falls_back_to_response_json(fake_session: FakeSession) -> None:
+    """Bodies orjson can't decode should still go through requests' own JSON handling."""
+    pytest.importorskip("orjson")
+    fake_session.response = FakeResponse('[{"epaName": "Caf\u00e9"}]'.encode("latin-1"), encoding="latin-1")
+
+    assert casquery.send_request("https://example.test/latin1") == [{"epaName": "Caf\u00e9"}]
+
+
+def test_send_request_warns_on_stderr(fake_session: FakeSession, capsys) -> None:
+    """HTTP failures should be reported on stderr as plain text, leaving stdout for results."""
+    fake_session.response = FakeResponse(status_code=404)
+
+    assert casquery.send_request("https://example.test/missing") is None
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert captured.err == "Warning: Received status 404 for https://example.test/missing\n"
+
+
 # -----------------------
 # casrn_search tests
 # -----------------------
@@ -131,6 +341,105 @@ def test_casrn_search_synonyms(monkeypatch) -> None:
     assert len(rows) == 1
     row = rows[0]
     assert row["synonyms"] == "PFBS;Perfluorobutane sulfonate"
+    # Rows are copied from the shared template, never written into it.
+    assert all(v is None for v in casquery._SYNONYMS_ROW_TEMPLATE.values())
+
+
+def test_casrn_search_concurrent_results_align(monkeypatch) -> None:
+    """Responses that finish out of order should still land on the right CAS RN."""
+
+    def fake_send_request(url: str) -> list[dict] | None:
+        cas = url.rsplit("/", 1)[-1].split("?", 1)[0]
+        # Make earlier inputs finish last.
+        time.sleep(0.05 if cas == "50-00-0" else 0)
+        return [{"epaName": f"name-{cas}", "currentCasNumber": cas}]
+
+    monkeypatch.setattr(casquery, "send_request", fake_send_request)
+
+    cas_list = ["50-00-0", "64-17-5", "67-64-1", "71-43-2"]
+    rows = casquery.casrn_search(cas_list)
+
+    assert [r["cas_rn"] for r in rows] == cas_list
+    assert all(r["epaName"] == f"name-{r['cas_rn']}" for r in rows)
+
+
+def test_casrn_search_unsorted_keeps_input_order(monkeypatch) -> None:
+    """sort=False should return rows in input order."""
+
+    def fake_send_request(url: str) -> list[dict] | None:
+        cas = url.rsplit("/", 1)[-1].split("?", 1)[0]
+        return [{"currentCasNumber": cas}]
+
+    monkeypatch.setattr(casquery, "send_request", fake_send_request)
+
+    cas_list = ["71-43-2", "50-00-0", "64-17-5"]
+    assert [r["cas_rn"] for r in casquery.casrn_search(cas_list, sort=False)] == cas_list
+    assert [r["cas_rn"] for r in casquery.casrn_search(cas_list)] == sorted(cas_list)
+
+
+@pytest.mark.parametrize("is_terminal", [True, False])
+def test_casrn_search_progress_only_on_terminal(monkeypatch, is_terminal: bool) -> None:
+    """The progress bar should only be used when the console is an interactive terminal."""
+    tracked: list[int] = []
+
+    def _track(iterable, **kwargs):
+        tracked.append(kwargs["total"])
+        return iterable
+
+    monkeypatch.setattr(casquery, "track", _track)
+    monkeypatch.setattr(casquery, "send_request", lambda url: [])
+    monkeypatch.setattr(casquery, "console", Console(force_terminal=is_terminal))
+
+    casquery.casrn_search(["7732-18-5", "64-17-5"])
+
+    assert tracked == ([2] if is_terminal else [])
+
+
+def test_casrn_search_deduplicates_requests(monkeypatch) -> None:
+    """Inputs that normalize to the same CAS RN should be queried only once."""
+    urls: list[str] = []
+
+    def fake_send_request(url: str) -> list[dict] | None:
+        urls.append(url)
+        return [{"epaName": "PFBS", "currentCasNumber": "375-73-5"}]
+
+    monkeypatch.setattr(casquery, "send_request", fake_send_request)
+
+    rows = casquery.casrn_search(["375-73-5", "375735", " 375 73 5 "])
+
+    assert len(urls) == 1
+    assert len(rows) == 3
+    assert all(r["cas_rn"] == "375-73-5" and r["epaName"] == "PFBS" for r in rows)
+    # Each input gets its own row object.
+    assert len({id(r) for r in rows}) == 3
+
+
+def test_casrn_search_failure_cancels_queued_requests(monkeypatch) -> None:
+    """An error from one query should cancel the queued ones instead of draining the whole list."""
+    submitted = []
+
+    class RecordingExecutor(casquery.ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            future = super().submit(*args, **kwargs)
+            submitted.append(future)
+            return future
+
+    def fake_query_one(cleaned: str, synonyms: bool) -> dict[str, Any]:
+        if cleaned == "0":
+            raise RuntimeError("boom")
+        time.sleep(0.05)
+        return {"cas_rn": cleaned}
+
+    monkeypatch.setattr(casquery, "ThreadPoolExecutor", RecordingExecutor)
+    monkeypatch.setattr(casquery, "MAX_WORKERS", 2)
+    monkeypatch.setattr(casquery, "_query_one", fake_query_one)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        casquery.casrn_search([str(i) for i in range(20)])
+
+    assert len(submitted) == 20
+    # Only what the two workers had already picked up may run; the rest never start.
+    assert sum(f.cancelled() for f in submitted) >= 20 - 2 * casquery.MAX_WORKERS
 
 
 # -----------------------
@@ -155,6 +464,7 @@ def test_batch_adds_metadata(monkeypatch, tmp_path: Path) -> None:
         cas_rn_list: list[str],
         synonyms: bool = False,
         output_format: casquery.OutputFormat = casquery.OutputFormat.TABLE,
+        sort: bool = True,
     ):
         # cas_rn_list will contain normalized CAS numbers
         out = []
@@ -188,6 +498,8 @@ def test_batch_adds_metadata(monkeypatch, tmp_path: Path) -> None:
         input_csv=input_csv,
         column="cas_rn",
         output_csv=output_csv,
+        cache=None,
+        check_digit=False,
     )
 
     # Read the output and verify
@@ -220,6 +532,130 @@ def test_batch_adds_metadata(monkeypatch, tmp_path: Path) -> None:
     assert row_s2["casquery_normalized"] == "29420-43-3"
     assert row_s2["casquery_resolved"] == "375-73-5"
     assert "potassium" in row_s2["casquery_systematicName"]
+    assert casquery._USE_CACHE is False
+
+
+def test_batch_streams_rows_and_overwrites_existing_extras(monkeypatch, tmp_path: Path) -> None:
+    """batch should keep row order, tolerate blank/short rows, and reuse existing casquery_* columns."""
+    input_csv = tmp_path / "input.csv"
+    input_csv.write_text(
+        "sample_id,cas_rn,casquery_resolved\nS1,375735,stale\n\nS2\nS3,not-a-cas,stale\n",
+        encoding="utf-8",
+    )
+    output_csv = tmp_path / "output.csv"
+    searched: list[list[str]] = []
+
+    def fake_casrn_search(cas_rn_list, synonyms=False, output_format=casquery.OutputFormat.TABLE, sort=True):
+        searched.append(list(cas_rn_list))
+        return [
+            {"cas_rn": "375-73-5", "systematicName": "PFBS acid", "epaName": "PFBS", "currentCasNumber": "375-73-5"},
+        ]
+
+    monkeypatch.setattr(casquery, "casrn_search", fake_casrn_search)
+
+    casquery.batch(input_csv=input_csv, column="cas_rn", output_csv=output_csv, cache=None, check_digit=False)
+
+    assert searched == [["375-73-5"]]
+    with output_csv.open("r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        assert next(reader) == [
+            "sample_id",
+            "cas_rn",
+            "casquery_resolved",
+            "casquery_normalized",
+            "casquery_systematicName",
+            "casquery_epaName",
+        ]
+        assert list(reader) == [
+            ["S1", "375735", "375-73-5", "375-73-5", "PFBS acid", "PFBS"],
+            ["S2", "", "", "", "", ""],
+            ["S3", "not-a-cas", "", "", "", ""],
+        ]
+
+
+def test_cli_batch_keeps_overflow_fields_and_uses_last_duplicate_column(monkeypatch, tmp_path: Path) -> None:
+    """Fields past the header should survive with a warning; the last duplicate column is the CAS one."""
+    input_csv = tmp_path / "input.csv"
+    input_csv.write_text("cas_rn,cas_rn\nignored,375735,note-a,note-b\n", encoding="utf-8")
+    output_csv = tmp_path / "output.csv"
+    searched: list[list[str]] = []
+
+    def fake_casrn_search(cas_rn_list, synonyms=False, output_format=casquery.OutputFormat.TABLE, sort=True):
+        searched.append(list(cas_rn_list))
+        return []
+
+    monkeypatch.setattr(casquery, "casrn_search", fake_casrn_search)
+
+    result = runner.invoke(casquery.app, ["batch", str(input_csv), "--output", str(output_csv)])
+    assert result.exit_code == 0
+    assert searched == [["375-73-5"]]
+    assert "1 row(s) had more fields than the header" in result.stdout
+
+    with output_csv.open("r", newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f))[1] == ["ignored", "375735", "375-73-5", "", "", "", "note-a", "note-b"]
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+def test_cli_batch_reads_non_seekable_input_once(monkeypatch, tmp_path: Path) -> None:
+    """Piped input (`batch <(cmd)`) can't be reopened, so pass 2 must replay a copy of it."""
+    fifo = tmp_path / "input.csv"
+    os.mkfifo(fifo)
+    output_csv = tmp_path / "output.csv"
+
+    def feed() -> None:
+        with fifo.open("w", encoding="utf-8") as f:
+            f.write("sample_id,cas_rn\nS1,375735\nS2,7732-18-5\n")
+
+    writer = threading.Thread(target=feed)
+    writer.start()
+
+    def fake_casrn_search(cas_rn_list, synonyms=False, output_format=casquery.OutputFormat.TABLE, sort=True):
+        return [
+            {"cas_rn": cas, "systematicName": None, "epaName": None, "currentCasNumber": cas} for cas in cas_rn_list
+        ]
+
+    monkeypatch.setattr(casquery, "casrn_search", fake_casrn_search)
+
+    result = runner.invoke(casquery.app, ["batch", str(fifo), "--output", str(output_csv)])
+    writer.join()
+    assert result.exit_code == 0
+
+    with output_csv.open("r", newline="", encoding="utf-8") as f:
+        out_rows = list(csv.DictReader(f))
+    assert [(r["sample_id"], r["casquery_resolved"]) for r in out_rows] == [("S1", "375-73-5"), ("S2", "7732-18-5")]
+
+
+def test_cli_batch_check_digit_skips_invalid_cas(monkeypatch, tmp_path: Path) -> None:
+    """--check-digit should keep CAS RN with a bad check digit out of the EPA SRS query."""
+    input_csv = tmp_path / "input.csv"
+    input_csv.write_text("cas_rn\n7732-18-5\n7732-18-4\n", encoding="utf-8")
+    output_csv = tmp_path / "output.csv"
+    searched: list[list[str]] = []
+
+    def fake_casrn_search(cas_rn_list, synonyms=False, output_format=casquery.OutputFormat.TABLE, sort=True):
+        searched.append(list(cas_rn_list))
+        return [
+            {"cas_rn": "7732-18-5", "systematicName": "Water", "epaName": "Water", "currentCasNumber": "7732-18-5"},
+        ]
+
+    monkeypatch.setattr(casquery, "casrn_search", fake_casrn_search)
+
+    result = runner.invoke(casquery.app, ["batch", str(input_csv), "--output", str(output_csv), "--check-digit"])
+    assert result.exit_code == 0
+    assert searched == [["7732-18-5"]]
+
+    with output_csv.open("r", newline="", encoding="utf-8") as f:
+        out_rows = list(csv.DictReader(f))
+    assert [r["casquery_normalized"] for r in out_rows] == ["7732-18-5", ""]
+
+
+def test_batch_missing_column(tmp_path: Path) -> None:
+    input_csv = tmp_path / "input.csv"
+    input_csv.write_text("sample_id,cas\nS1,375735\n", encoding="utf-8")
+
+    result = runner.invoke(casquery.app, ["batch", str(input_csv), "--output", str(tmp_path / "out.csv")])
+    assert result.exit_code == 1
+    assert "not found" in result.stdout
 
 
 # -----------------------
@@ -240,6 +676,7 @@ def test_cli_search_json(monkeypatch) -> None:
         cas_rn_list,
         synonyms: bool = False,
         output_format: casquery.OutputFormat = casquery.OutputFormat.TABLE,
+        sort: bool = True,
     ):
         return [
             {
@@ -264,6 +701,113 @@ def test_cli_search_json(monkeypatch) -> None:
     assert data[0]["cas_rn"] == "375-73-5"
 
 
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_rows_to_json_stdout_matches_json_dump(monkeypatch, capsys, use_orjson: bool) -> None:
+    """Row-by-row JSON output should match a single indented json.dump, with or without orjson."""
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(casquery, "orjson", None)
+
+    rows = [
+        {"cas_rn": "7732-18-5", "epaName": "Water", "currentCasNumber": None},
+        {"cas_rn": "64-17-5", "epaName": 'Ethanol "EtOH"', "currentCasNumber": "64-17-5"},
+    ]
+
+    casquery.rows_to_json_stdout(rows)
+    assert capsys.readouterr().out == json.dumps(rows, indent=2, ensure_ascii=False) + "\n"
+
+    casquery.rows_to_json_stdout([])
+    assert capsys.readouterr().out == "[]\n"
+
+
+def test_rows_to_json_stdout_follows_redirected_stdout() -> None:
+    """JSON output should land in whatever text stream stdout is redirected to."""
+    rows = [{"cas_rn": "64-17-5", "epaName": "\u00c9thanol"}]
+
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        casquery.rows_to_json_stdout(rows)
+    assert json.loads(buf.getvalue()) == rows
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_rows_to_json_stdout_escapes_for_non_utf8_stdout(monkeypatch, use_orjson: bool) -> None:
+    """A cp1252 stdout (e.g. a Windows redirect) should get escaped ASCII JSON, not UnicodeEncodeError."""
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(casquery, "orjson", None)
+    raw = io.BytesIO()
+    stream = io.TextIOWrapper(raw, encoding="cp1252", newline="")
+    monkeypatch.setattr(sys, "stdout", stream)
+    rows = [{"cas_rn": "99-06-9", "synonyms": "\u03b1-hydroxy"}]
+
+    casquery.rows_to_json_stdout(rows)
+
+    assert raw.getvalue().decode("ascii") == json.dumps(rows, indent=2) + "\n"
+
+
+def test_rows_to_csv_stdout(capsys) -> None:
+    """CSV output should follow the first row's header order and blank out None."""
+    rows = [
+        {"cas_rn": "7732-18-5", "epaName": "Water", "currentCasNumber": None},
+        {"cas_rn": "64-17-5", "epaName": "Ethanol, anhydrous", "currentCasNumber": "64-17-5"},
+    ]
+    casquery.rows_to_csv_stdout(rows)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [
+        "cas_rn,epaName,currentCasNumber",
+        "7732-18-5,Water,",
+        '64-17-5,"Ethanol, anhydrous",64-17-5',
+    ]
+
+    # A single column must not be split into characters.
+    casquery.rows_to_csv_stdout([{"cas_rn": "7732-18-5"}])
+    assert capsys.readouterr().out.splitlines() == ["cas_rn", "7732-18-5"]
+
+
+def test_import_keeps_rich_table_unloaded() -> None:
+    """Importing casquery must not load rich.progress/rich.table; only table output needs them."""
+    code = (
+        "import sys, casquery.casquery; "
+        "print(sorted(m for m in ('rich.progress', 'rich.table', 'rich.box') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)  # noqa: S603
+    assert result.stdout.strip() == "[]"
+
+
+def test_cli_search_xml(monkeypatch) -> None:
+    """search subcommand with XML output should print a well-formed, escaped document."""
+
+    def fake_casrn_search(
+        cas_rn_list,
+        synonyms: bool = False,
+        output_format: casquery.OutputFormat = casquery.OutputFormat.TABLE,
+        sort: bool = True,
+    ):
+        return [
+            {
+                "cas_rn": "7732-18-5",
+                "systematicName": "Water <H2O> & ice",
+                "epaName": None,
+                "currentCasNumber": "7732-18-5",
+            },
+        ]
+
+    monkeypatch.setattr(casquery, "casrn_search", fake_casrn_search)
+
+    result = runner.invoke(casquery.app, ["search", "--format", "xml", "7732-18-5"])
+    assert result.exit_code == 0
+
+    root = ET.fromstring(result.stdout)  # noqa: S314 - parsing our own output
+    assert root.tag == "casResults"
+    item = root.find("result")
+    assert item is not None
+    assert item.findtext("systematicName") == "Water <H2O> & ice"
+    assert item.findtext("epaName") == ""
+
+
 def test_cli_search_table(monkeypatch) -> None:
     """search subcommand with table output should succeed and show CAS in output."""
 
@@ -271,6 +815,7 @@ def test_cli_search_table(monkeypatch) -> None:
         cas_rn_list,
         synonyms: bool = False,
         output_format: casquery.OutputFormat = casquery.OutputFormat.TABLE,
+        sort: bool = True,
     ):
         return [
             {
@@ -305,6 +850,7 @@ def test_cli_resolve(monkeypatch) -> None:
         cas_rn_list,
         synonyms: bool = False,
         output_format: casquery.OutputFormat = casquery.OutputFormat.TABLE,
+        sort: bool = True,
     ):
         return [
             {